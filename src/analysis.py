@@ -11,6 +11,53 @@ import sqlite3
 import numpy as np
 from .exceptions import DataLoadError, AnalysisConfigurationError
 
+# Number of fixed-width bins used by the materialized histogram tables
+HISTOGRAM_BINS = 10
+
+# Columns of the 'mapped_test_results' table, in insert order
+MAPPED_COLUMNS = ['X (test func)', 'Y (test func)', 'Delta Y (test func)', 'No. of ideal func']
+
+# Schema of the raw results table and of the summary tables kept next to it.
+# mapped_summary also stores the histogram ranges, so the bins of a function
+# are always read back with the edges they were counted with.
+MAPPED_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS mapped_test_results (
+        "X (test func)" REAL,
+        "Y (test func)" REAL,
+        "Delta Y (test func)" REAL,
+        "No. of ideal func" TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS mapped_summary (
+        ideal_func TEXT PRIMARY KEY,
+        count INTEGER NOT NULL,
+        sum_delta_y REAL NOT NULL,
+        min_delta_y REAL NOT NULL,
+        max_delta_y REAL NOT NULL,
+        deviation_upper REAL NOT NULL,
+        x_lower REAL NOT NULL,
+        x_upper REAL NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS mapped_deviation_histogram (
+        ideal_func TEXT NOT NULL,
+        bin INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (ideal_func, bin)
+    )""",
+    """CREATE TABLE IF NOT EXISTS mapped_x_histogram (
+        ideal_func TEXT NOT NULL,
+        bin INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (ideal_func, bin)
+    )""",
+]
+SUMMARY_TABLES = ["mapped_summary", "mapped_deviation_histogram", "mapped_x_histogram"]
+
+# Read queries for the histogram tables, by histogram kind
+HISTOGRAM_QUERIES = {
+    "deviation": "SELECT bin, count FROM mapped_deviation_histogram WHERE ideal_func = ?",
+    "x": "SELECT bin, count FROM mapped_x_histogram WHERE ideal_func = ?",
+}
+
 # NEW Class for Inheritance 
 class DatabaseAnalyzer:
     """
@@ -130,7 +177,11 @@ class TestDataMapper(DatabaseAnalyzer):
             for train_func, ideal_func in best_matches.items()
         }
         self.chosen_ideal_cols = list(self.thresholds.keys())
-        
+
+        # Fixed x-range for the x-coverage histograms, taken from the ideal set
+        self.x_min = float(self.ideal_df['x'].min())
+        self.x_max = float(self.ideal_df['x'].max())
+
     def map_test_points(self) -> pd.DataFrame:
         """
         Iterates through test data and maps points that fall within
@@ -176,16 +227,261 @@ class TestDataMapper(DatabaseAnalyzer):
         print(f"✅ Mapping complete. {len(mapped_rows)} points mapped.")
         return pd.DataFrame(mapped_rows)
 
-    def save_results_to_db(self, mapped_df: pd.DataFrame):
+    def save_results_to_db(self, mapped_df: pd.DataFrame, append: bool = False):
         """
         Saves the final mapped DataFrame to a new table in the database
-        as required.#
-        
-        Note: This uses the parent's `self.conn` (sqlite3) and pandas,
-        not sqlalchemy, to match the sample code's architecture.
+        as required, and updates the summary tables for the batch.
+
+        The raw rows and the summary tables are written under one savepoint,
+        so a failed save leaves both unchanged. If the connection already has
+        an open transaction, the save joins it and is committed with it.
+
+        Args:
+            mapped_df (pd.DataFrame): The mapped points to write. May be
+                                      empty if no point was mapped.
+            append (bool): If True, the batch is added to the existing
+                           results and summaries instead of replacing them.
+                           If the summaries do not cover every row already in
+                           'mapped_test_results' (e.g. rows written before the
+                           summary tables existed), they are rebuilt from the
+                           raw table first.
+
+        Raises:
+            AnalysisConfigurationError: If the batch names a function this
+                mapper has no threshold for, or if the stored histogram
+                ranges differ from this mapper's.
+            DataLoadError: If the database write fails.
+
+        Note: This uses the parent's `self.conn` (sqlite3), not sqlalchemy,
+        to match the sample code's architecture.
         """
+        if append and mapped_df.empty:
+            print("No mapped results to append; tables left unchanged.")
+            return
+
+        rebuild = not append or self._summaries_out_of_sync()
+        if append and rebuild:
+            print("Summary tables do not match 'mapped_test_results'; rebuilding them.")
+            source_df = pd.concat([self._load_data_from_db("mapped_test_results"), mapped_df],
+                                  ignore_index=True)
+        else:
+            source_df = mapped_df
+
+        # Everything that can fail on bad input is done before writing
+        summary_rows, histogram_rows = self._build_summary_rows(source_df)
+        if not rebuild:
+            self._check_histogram_ranges(summary_rows)
+        raw_rows = ([] if mapped_df.empty else
+                    list(mapped_df[MAPPED_COLUMNS].itertuples(index=False, name=None)))
+
         try:
-            mapped_df.to_sql("mapped_test_results", self.conn, if_exists='replace', index=False)
+            self.conn.execute("SAVEPOINT save_mapped_results")
+            try:
+                if not append:
+                    self.conn.execute("DROP TABLE IF EXISTS mapped_test_results")
+                if rebuild:
+                    for table in SUMMARY_TABLES:
+                        self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+                for statement in MAPPED_SCHEMA:
+                    self.conn.execute(statement)
+
+                self.conn.executemany(
+                    "INSERT INTO mapped_test_results VALUES (?, ?, ?, ?)", raw_rows
+                )
+                self.conn.executemany("""
+                    INSERT INTO mapped_summary VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(ideal_func) DO UPDATE SET
+                        count = count + excluded.count,
+                        sum_delta_y = sum_delta_y + excluded.sum_delta_y,
+                        min_delta_y = MIN(min_delta_y, excluded.min_delta_y),
+                        max_delta_y = MAX(max_delta_y, excluded.max_delta_y)
+                """, summary_rows)
+                for table, rows in histogram_rows.items():
+                    self.conn.executemany(f"""
+                        INSERT INTO {table} VALUES (?, ?, ?)
+                        ON CONFLICT(ideal_func, bin) DO UPDATE SET
+                            count = count + excluded.count
+                    """, rows)
+            except Exception:
+                self.conn.execute("ROLLBACK TO save_mapped_results")
+                self.conn.execute("RELEASE save_mapped_results")
+                raise
+            self.conn.execute("RELEASE save_mapped_results")
             print(f"✅ Saved {len(mapped_df)} mapped results to 'mapped_test_results' table.")
         except Exception as e:
             raise DataLoadError("saving mapped results", e)
+
+    def _summaries_out_of_sync(self) -> bool:
+        """Checks whether the summaries count every row of 'mapped_test_results'."""
+        raw_count = self._select("SELECT COUNT(*) FROM mapped_test_results")
+        summary_count = self._select("SELECT SUM(count) FROM mapped_summary")
+        raw_count = raw_count[0][0] if raw_count else 0
+        summary_count = (summary_count[0][0] or 0) if summary_count else 0
+        return raw_count != summary_count
+
+    @staticmethod
+    def _bin_index(values: pd.Series, lower: float, upper: float) -> np.ndarray:
+        """
+        Assigns each value to one of HISTOGRAM_BINS equal-width bins over
+        [lower, upper]. Values on or outside the edges go to the outer bins.
+        """
+        width = upper - lower
+        if width <= 0:
+            return np.zeros(len(values), dtype=int)
+        idx = np.floor((values.to_numpy(dtype=float) - lower) / width * HISTOGRAM_BINS)
+        return np.clip(idx, 0, HISTOGRAM_BINS - 1).astype(int)
+
+    @staticmethod
+    def _bin_edges(lower: float, upper: float, bin_no: int) -> tuple[float, float]:
+        """Returns the (lower, upper) edges of a histogram bin."""
+        width = (upper - lower) / HISTOGRAM_BINS
+        return lower + bin_no * width, lower + (bin_no + 1) * width
+
+    def _build_summary_rows(self, mapped_df: pd.DataFrame) -> tuple[list, dict]:
+        """
+        Aggregates a batch of mapped points into rows for the summary tables.
+
+        Returns:
+            tuple[list, dict]: A tuple containing:
+                - summary rows for 'mapped_summary'
+                - {histogram_table: [(ideal_func, bin, count), ...]}
+
+        Raises:
+            AnalysisConfigurationError: If a function has no threshold.
+        """
+        histogram_rows = {"mapped_deviation_histogram": [], "mapped_x_histogram": []}
+        if mapped_df.empty:
+            return [], histogram_rows
+
+        unknown = set(mapped_df['No. of ideal func']) - set(self.thresholds)
+        if unknown:
+            raise AnalysisConfigurationError(
+                f"No threshold for ideal function(s) {sorted(unknown)} in mapped results."
+            )
+
+        summary_rows = []
+        for ideal_func, group in mapped_df.groupby('No. of ideal func'):
+            delta_y = group['Delta Y (test func)']
+            threshold = float(self.thresholds[ideal_func])
+            summary_rows.append((ideal_func, len(group), float(delta_y.sum()),
+                                 float(delta_y.min()), float(delta_y.max()),
+                                 threshold, self.x_min, self.x_max))
+
+            ranges = {
+                "mapped_deviation_histogram": (delta_y, 0.0, threshold),
+                "mapped_x_histogram": (group['X (test func)'], self.x_min, self.x_max),
+            }
+            for table, (values, lower, upper) in ranges.items():
+                counts = np.bincount(self._bin_index(values, lower, upper),
+                                     minlength=HISTOGRAM_BINS)
+                histogram_rows[table].extend(
+                    (ideal_func, bin_no, int(count))
+                    for bin_no, count in enumerate(counts) if count
+                )
+        return summary_rows, histogram_rows
+
+    def _check_histogram_ranges(self, summary_rows: list):
+        """
+        Makes sure appended counts use the same bin edges as the stored ones.
+
+        Raises:
+            AnalysisConfigurationError: If the stored ranges differ.
+        """
+        for ideal_func, *_, deviation_upper, x_lower, x_upper in summary_rows:
+            stored = self._stored_ranges(ideal_func)
+            if stored and not np.allclose(stored, (deviation_upper, x_lower, x_upper)):
+                raise AnalysisConfigurationError(
+                    f"Histogram ranges for '{ideal_func}' differ from the stored summary; "
+                    "save with append=False to rebuild it."
+                )
+
+    def get_function_summary(self, ideal_func: str) -> dict:
+        """
+        Returns the stored aggregates for one ideal function.
+
+        Args:
+            ideal_func (str): The ideal function column, e.g. 'y36'.
+
+        Returns:
+            dict: {'count', 'min_delta_y', 'max_delta_y', 'mean_delta_y'}.
+                  All values are 0 if no point was mapped to the function.
+        """
+        row = self._select(
+            "SELECT count, min_delta_y, max_delta_y, sum_delta_y "
+            "FROM mapped_summary WHERE ideal_func = ?", (ideal_func,)
+        )
+        if not row:
+            return {'count': 0, 'min_delta_y': 0.0, 'max_delta_y': 0.0, 'mean_delta_y': 0.0}
+        count, min_dy, max_dy, sum_dy = row[0]
+        return {
+            'count': count,
+            'min_delta_y': min_dy,
+            'max_delta_y': max_dy,
+            'mean_delta_y': sum_dy / count,
+        }
+
+    def get_deviation_histogram(self, ideal_func: str) -> pd.DataFrame:
+        """
+        Returns the Delta Y histogram of one ideal function, with
+        HISTOGRAM_BINS bins spanning [0, threshold].
+        """
+        stored = self._stored_ranges(ideal_func)
+        if stored:
+            value_range = (0.0, stored[0])
+        else:
+            value_range = (0.0, float(self.thresholds.get(ideal_func, 0.0)))
+        return self._load_histogram("deviation", ideal_func, value_range)
+
+    def get_x_histogram(self, ideal_func: str) -> pd.DataFrame:
+        """
+        Returns the x-coverage histogram of one ideal function, with
+        HISTOGRAM_BINS bins spanning the x-range of the ideal data.
+        """
+        stored = self._stored_ranges(ideal_func)
+        value_range = (stored[1], stored[2]) if stored else (self.x_min, self.x_max)
+        return self._load_histogram("x", ideal_func, value_range)
+
+    def _stored_ranges(self, ideal_func: str):
+        """
+        Returns the (deviation_upper, x_lower, x_upper) ranges the stored
+        bins of a function were counted with, or None if nothing is stored.
+        """
+        row = self._select(
+            "SELECT deviation_upper, x_lower, x_upper FROM mapped_summary "
+            "WHERE ideal_func = ?", (ideal_func,)
+        )
+        return row[0] if row else None
+
+    def _load_histogram(self, kind: str, ideal_func: str,
+                        value_range: tuple[float, float]) -> pd.DataFrame:
+        """
+        Reads the stored bins of one function and fills in the empty ones.
+
+        Args:
+            kind (str): 'deviation' or 'x', see HISTOGRAM_QUERIES.
+            ideal_func (str): The ideal function column.
+            value_range (tuple[float, float]): The (lower, upper) range the
+                                               bins span.
+
+        Returns:
+            pd.DataFrame: Columns (bin, lower, upper, count), one row per bin.
+        """
+        lower, upper = value_range
+        stored = dict(self._select(HISTOGRAM_QUERIES[kind], (ideal_func,)))
+        rows = []
+        for bin_no in range(HISTOGRAM_BINS):
+            bin_lower, bin_upper = self._bin_edges(lower, upper, bin_no)
+            rows.append({'bin': bin_no, 'lower': bin_lower, 'upper': bin_upper,
+                         'count': stored.get(bin_no, 0)})
+        return pd.DataFrame(rows)
+
+    def _select(self, sql: str, params: tuple = ()) -> list:
+        """Runs a read-only query; a missing table reads as no rows."""
+        try:
+            return self.conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as e:
+            if "no such table" in str(e):
+                return []
+            raise DataLoadError("summary tables", e)
+        except sqlite3.Error as e:
+            raise DataLoadError("summary tables", e)
@@ -13,7 +13,8 @@ from unittest.mock import patch, MagicMock
 
 ## Add src to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from src.analysis import FunctionFitter, TestDataMapper
+from src.analysis import FunctionFitter, TestDataMapper, HISTOGRAM_BINS
+from src.exceptions import AnalysisConfigurationError
 
 class TestFunctionFitter(unittest.TestCase):
     
@@ -49,5 +50,203 @@ class TestFunctionFitter(unittest.TestCase):
         self.assertEqual(best_matches['y2'], 'y1') # y2(train) should match y1(ideal)
         self.assertAlmostEqual(max_devs['y1'], 0.0) # Deviation for perfect match is 0
 
+
+class TestMapperSummaries(unittest.TestCase):
+    """
+    Tests the incrementally maintained summary tables of TestDataMapper.
+    Uses an in-memory database; only the source tables are mocked.
+    """
+
+    @patch('src.analysis.DatabaseAnalyzer._load_data_from_db')
+    def setUp(self, mock_load_data):
+        test_df = pd.DataFrame({'x': [0.0], 'y': [5.0]})
+        ideal_df = pd.DataFrame({'x': [0.0, 10.0], 'y1': [0.0, 0.0], 'y2': [0.0, 0.0]})
+        mock_load_data.side_effect = [test_df, ideal_df]
+        self.mapper = TestDataMapper(
+            {'y1': 'y1', 'y2': 'y2'},
+            {'y1': 1.0 / np.sqrt(2), 'y2': 1.0 / np.sqrt(2)},
+            db_name=":memory:"
+        )
+
+    def tearDown(self):
+        self.mapper.close()
+
+    @staticmethod
+    def _batch(rows):
+        return pd.DataFrame(rows, columns=['X (test func)', 'Y (test func)',
+                                           'Delta Y (test func)', 'No. of ideal func'])
+
+    def test_summary_accumulates_over_batches(self):
+        """Appended batches are folded into the existing aggregates."""
+        self.mapper.save_results_to_db(self._batch([
+            (1.0, 0.1, 0.1, 'y1'), (9.5, 0.3, 0.3, 'y1'), (2.0, 0.5, 0.5, 'y2'),
+        ]))
+        self.mapper.save_results_to_db(self._batch([
+            (5.0, 0.95, 0.95, 'y1'),
+        ]), append=True)
+
+        summary = self.mapper.get_function_summary('y1')
+        self.assertEqual(summary['count'], 3)
+        self.assertAlmostEqual(summary['min_delta_y'], 0.1)
+        self.assertAlmostEqual(summary['max_delta_y'], 0.95)
+        self.assertAlmostEqual(summary['mean_delta_y'], 0.45)
+        self.assertEqual(self.mapper.get_function_summary('y2')['count'], 1)
+
+        dev_hist = self.mapper.get_deviation_histogram('y1')
+        self.assertEqual(len(dev_hist), 10)
+        self.assertEqual(dev_hist['count'].tolist(), [0, 1, 0, 1, 0, 0, 0, 0, 0, 1])
+
+        x_hist = self.mapper.get_x_histogram('y1')
+        self.assertEqual(x_hist['count'].tolist(), [0, 1, 0, 0, 0, 1, 0, 0, 0, 1])
+        self.assertAlmostEqual(x_hist['upper'].iloc[-1], 10.0)
+
+    def test_replace_resets_summary(self):
+        """A non-append save discards the previous aggregates."""
+        self.mapper.save_results_to_db(self._batch([(1.0, 0.1, 0.1, 'y1')]))
+        self.mapper.save_results_to_db(self._batch([(2.0, 0.2, 0.2, 'y2')]))
+
+        self.assertEqual(self.mapper.get_function_summary('y1')['count'], 0)
+        self.assertEqual(self.mapper.get_function_summary('y2')['count'], 1)
+        self.assertEqual(self.mapper.get_x_histogram('y1')['count'].sum(), 0)
+
+    def _raw_rows(self):
+        return self.mapper.conn.execute(
+            "SELECT * FROM mapped_test_results ORDER BY rowid").fetchall()
+
+    def _summary_state(self):
+        return [self.mapper.conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2").fetchall()
+                for table in ('mapped_summary', 'mapped_deviation_histogram',
+                              'mapped_x_histogram')]
+
+    def test_failed_save_leaves_tables_unchanged(self):
+        """A batch that cannot be summarized writes nothing, in either mode."""
+        self.mapper.save_results_to_db(self._batch([(1.0, 0.1, 0.1, 'y1')]))
+        raw_before, summary_before = self._raw_rows(), self._summary_state()
+
+        bad_batch = self._batch([(2.0, 0.2, 0.2, 'y1'), (3.0, 0.3, 0.3, 'y99')])
+        for append in (True, False):
+            with self.assertRaises(AnalysisConfigurationError):
+                self.mapper.save_results_to_db(bad_batch, append=append)
+            self.assertEqual(self._raw_rows(), raw_before)
+            self.assertEqual(self._summary_state(), summary_before)
+            self.assertEqual(self.mapper.get_function_summary('y1')['count'], 1)
+
+    def test_append_backfills_summary_from_existing_rows(self):
+        """Rows written without summaries are counted on the next append."""
+        self._batch([(1.0, 0.1, 0.1, 'y1'), (2.0, 0.2, 0.2, 'y2')]).to_sql(
+            "mapped_test_results", self.mapper.conn, index=False)
+
+        self.mapper.save_results_to_db(self._batch([(3.0, 0.3, 0.3, 'y1')]), append=True)
+
+        self.assertEqual(len(self._raw_rows()), 3)
+        self.assertEqual(self.mapper.get_function_summary('y1')['count'], 2)
+        self.assertAlmostEqual(self.mapper.get_function_summary('y1')['mean_delta_y'], 0.2)
+        self.assertEqual(self.mapper.get_function_summary('y2')['count'], 1)
+
+    def test_append_with_different_ranges_raises(self):
+        """Counts are never added into bins with different edges."""
+        self.mapper.save_results_to_db(self._batch([(1.0, 0.1, 0.1, 'y1')]))
+        self.mapper.thresholds['y1'] = 2.0
+
+        with self.assertRaises(AnalysisConfigurationError):
+            self.mapper.save_results_to_db(self._batch([(2.0, 0.2, 0.2, 'y1')]), append=True)
+        self.assertEqual(len(self._raw_rows()), 1)
+
+    def test_empty_mapping_saves_in_both_modes(self):
+        """A batch with no mapped points creates the tables or leaves them as they are."""
+        empty = self.mapper.map_test_points()  # the only test point is out of range
+        self.assertTrue(empty.empty)
+
+        self.mapper.save_results_to_db(empty)
+        self.assertEqual(self._raw_rows(), [])
+        self.assertEqual(self._summary_state(), [[], [], []])
+
+        self.mapper.save_results_to_db(self._batch([(1.0, 0.1, 0.1, 'y1')]), append=True)
+        raw_before, summary_before = self._raw_rows(), self._summary_state()
+        self.mapper.save_results_to_db(empty, append=True)
+        self.assertEqual(self._raw_rows(), raw_before)
+        self.assertEqual(self._summary_state(), summary_before)
+
+    def test_save_inside_open_transaction(self):
+        """Saving joins a transaction the caller already started."""
+        self.mapper.save_results_to_db(self._batch([(1.0, 0.1, 0.1, 'y1')]))
+        self.mapper.conn.execute("INSERT INTO mapped_test_results VALUES (2.0, 0.2, 0.2, 'y1')")
+        self.assertTrue(self.mapper.conn.in_transaction)
+
+        self.mapper.save_results_to_db(self._batch([(3.0, 0.3, 0.3, 'y1')]), append=True)
+
+        self.assertTrue(self.mapper.conn.in_transaction)
+        self.assertEqual(len(self._raw_rows()), 3)
+        self.assertEqual(self.mapper.get_function_summary('y1')['count'], 3)
+
+    def test_getters_do_not_write(self):
+        """Reading before any save creates no tables and returns empty results."""
+        self.assertEqual(self.mapper.get_function_summary('y1')['count'], 0)
+        self.assertEqual(self.mapper.get_deviation_histogram('y1')['count'].sum(), 0)
+        self.assertEqual(self.mapper.get_x_histogram('y1')['count'].sum(), 0)
+        tables = self.mapper.conn.execute("SELECT name FROM sqlite_master").fetchall()
+        self.assertEqual(tables, [])
+
+
+class TestMapperSummariesMatchRescan(unittest.TestCase):
+    """
+    Checks the incrementally maintained summaries against a full rescan
+    of 'mapped_test_results' after a real mapping saved in two batches.
+    """
+
+    @patch('src.analysis.DatabaseAnalyzer._load_data_from_db')
+    def test_summaries_match_rescan(self, mock_load_data):
+        rng = np.random.default_rng(0)
+        x = np.round(np.arange(-20, 20, 0.1), 1)
+        ideal_df = pd.DataFrame({'x': x, 'y1': x, 'y2': -x, 'y3': x ** 2 / 20, 'y4': np.sin(x)})
+        test_x = rng.choice(x, 300)
+        test_df = pd.DataFrame({
+            'x': test_x,
+            'y': rng.choice([1, -1], 300) * test_x + rng.normal(0, 0.5, 300),
+        })
+        mock_load_data.side_effect = [test_df, ideal_df]
+        best_matches = {f'y{i}': f'y{i}' for i in range(1, 5)}
+        max_devs = {f'y{i}': 0.6 for i in range(1, 5)}
+        mapper = TestDataMapper(best_matches, max_devs, db_name=":memory:")
+        self.addCleanup(mapper.close)
+
+        mapped_df = mapper.map_test_points()
+        self.assertGreater(len(mapped_df), 0)
+        half = len(mapped_df) // 2
+        mapper.save_results_to_db(mapped_df.iloc[:half])
+        mapper.save_results_to_db(mapped_df.iloc[half:], append=True)
+
+        raw = pd.read_sql("SELECT * FROM mapped_test_results", mapper.conn)
+        self.assertEqual(len(raw), len(mapped_df))
+        rescan = pd.read_sql(
+            'SELECT "No. of ideal func" AS func, COUNT(*) AS n, '
+            'MIN("Delta Y (test func)") AS min_dy, MAX("Delta Y (test func)") AS max_dy, '
+            'AVG("Delta Y (test func)") AS mean_dy '
+            'FROM mapped_test_results GROUP BY "No. of ideal func"', mapper.conn
+        ).set_index('func')
+
+        for func in mapper.chosen_ideal_cols:
+            summary = mapper.get_function_summary(func)
+            group = raw[raw['No. of ideal func'] == func]
+            if func not in rescan.index:
+                self.assertEqual(summary['count'], 0)
+                continue
+            self.assertEqual(summary['count'], rescan.loc[func, 'n'])
+            self.assertAlmostEqual(summary['min_delta_y'], rescan.loc[func, 'min_dy'])
+            self.assertAlmostEqual(summary['max_delta_y'], rescan.loc[func, 'max_dy'])
+            self.assertAlmostEqual(summary['mean_delta_y'], rescan.loc[func, 'mean_dy'])
+
+            dev_counts, dev_edges = np.histogram(
+                group['Delta Y (test func)'], bins=HISTOGRAM_BINS,
+                range=(0.0, mapper.thresholds[func]))
+            dev_hist = mapper.get_deviation_histogram(func)
+            self.assertEqual(dev_hist['count'].tolist(), dev_counts.tolist())
+            np.testing.assert_allclose(dev_hist['lower'], dev_edges[:-1])
+
+            x_counts, _ = np.histogram(group['X (test func)'], bins=HISTOGRAM_BINS,
+                                       range=(mapper.x_min, mapper.x_max))
+            self.assertEqual(mapper.get_x_histogram(func)['count'].tolist(), x_counts.tolist())
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file